@@ -1,4 +1,5 @@
 import os
+import re
 from pathlib import Path
 from typing import List
 from pydantic import BaseModel, Field
@@ -9,12 +10,23 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
+from langchain_core.caches import InMemoryCache
 
 from .config import settings
+from .cache import SemanticCache
 
 CURRENT_DIR = Path(__file__).parent.resolve()
 PROMPT_FILE_PATH = CURRENT_DIR / "data" / "audit_prompt.txt"
 
+# One scan finds every section header of the prompt's response schema.
+_SECTION_RE = re.compile(r"\*\*(THINKING|STATUS|RATIONALE|EVIDENCE CITATION)\*\*:")
+_SECTION_KEYS = {
+    "THINKING": "thinking",
+    "STATUS": "status",
+    "RATIONALE": "rationale",
+    "EVIDENCE CITATION": "citation"
+}
+
 class AuditResult(BaseModel):
     question: str
     thinking: str = Field(description="The step-by-step reasoning (CoT)")
@@ -23,19 +35,24 @@ class AuditResult(BaseModel):
     sources: List[str] = Field(description="List of filenames cited")
 
 class AuditEngine:
-    def __init__(self , model_name: str = settings.LLM_MODEL):
+    def __init__(self , model_name: str = settings.LLM_MODEL, embeddings=None):
         """
         Initializes the LLM and loads the Prompt Template from disk.
+        Pass the ingestor's embeddings to enable the semantic answer cache.
         """
         logger.debug(f"Initializing AuditEngine with LLM={model_name}")
 
-       
+        # Exact-prompt cache underneath the semantic one.
+        self.llm_cache = InMemoryCache(maxsize=settings.LLM_CACHE_MAXSIZE)
         self.llm = ChatGoogleGenerativeAI(
             model=model_name,
             temperature=0.0,
-            google_api_key=settings.GOOGLE_API_KEY
+            google_api_key=settings.GOOGLE_API_KEY,
+            cache=self.llm_cache
         )
 
+        self.semantic_cache = SemanticCache(embeddings) if embeddings is not None else None
+
         try:
             if not PROMPT_FILE_PATH.exists():
                 raise FileNotFoundError(f"Prompt file not found at: {PROMPT_FILE_PATH}")
@@ -64,11 +81,36 @@ class AuditEngine:
         
         return "\n---\n".join(formatted_chunks)
 
+    def clear_cache(self):
+        """Drops cached answers. Hooked to ingestion so new policies are never masked."""
+        self.llm_cache.clear()
+        if self.semantic_cache:
+            self.semantic_cache.clear()
+
     async def run_audit(self, question: str, retriever) -> AuditResult:
         logger.info(f"Auditing: {question}")
         
         try:
-            docs = await retriever.ainvoke(question)
+            query_vec = None
+            if self.semantic_cache and hasattr(retriever, "aretrieve_by_vector"):
+                # One embedding call serves both vector recall and the cache lookup.
+                embedding = await self.semantic_cache.embeddings.aembed_query(question)
+                docs = await retriever.aretrieve_by_vector(question, embedding)
+                query_vec = self.semantic_cache.unit(embedding)
+            else:
+                docs = await retriever.ainvoke(question)
+
+            if self.semantic_cache:
+                source_hash = self.semantic_cache.hash_sources(docs)
+                cached = self.semantic_cache.get_exact(question, source_hash)
+                if cached is None:
+                    if query_vec is None:
+                        query_vec = await self.semantic_cache.embed(question)
+                    cached = self.semantic_cache.get_similar(query_vec, source_hash)
+                if cached is not None:
+                    logger.success("Audit served from cache.")
+                    return AuditResult.model_validate_json(cached).model_copy(update={"question": question})
+
             context_text = self.format_docs(docs)
             
             chain = self.prompt | self.llm | StrOutputParser()
@@ -76,7 +118,10 @@ class AuditEngine:
 
             parsed = self._parse_structured_response(response_text)
 
-            unique_sources = list(set([d.metadata.get("source_file") for d in docs]))
+            # Single pass, retrieval order preserved, chunks without a source skipped.
+            unique_sources = list(dict.fromkeys(
+                src for src in (d.metadata.get("source_file") for d in docs) if src
+            ))
 
             result = AuditResult(
                 question=question,
@@ -86,6 +131,9 @@ class AuditEngine:
                 sources=unique_sources
             )
             
+            if query_vec is not None:
+                self.semantic_cache.add(question, query_vec, source_hash, result.model_dump_json())
+
             logger.success(f"Audit complete. Status: {result.status}")
             return result
 
@@ -108,19 +156,12 @@ class AuditEngine:
             "citation": ""
         }
         
-        try:
-            if "**THINKING**:" in text:
-                sections["thinking"] = text.split("**THINKING**:")[1].split("**STATUS**:")[0].strip()
-            
-            if "**STATUS**:" in text:
-                sections["status"] = text.split("**STATUS**:")[1].split("**RATIONALE**:")[0].strip()
-            
-            if "**RATIONALE**:" in text:
-                sections["rationale"] = text.split("**RATIONALE**:")[1].split("**EVIDENCE CITATION**:")[0].strip()
-            
-            if "**EVIDENCE CITATION**:" in text:
-                sections["citation"] = text.split("**EVIDENCE CITATION**:")[1].strip()
-        except Exception as e:
-            logger.warning(f"Parsing partial response: {e}")
+        # split() with a capturing group yields [preamble, tag, body, tag, body, ...].
+        parts = _SECTION_RE.split(text)
+        seen = set()
+        for tag, body in zip(parts[1::2], parts[2::2]):
+            if tag not in seen:
+                seen.add(tag)
+                sections[_SECTION_KEYS[tag]] = body.strip()
             
         return sections
\ No newline at end of file
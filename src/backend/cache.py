@@ -0,0 +1,125 @@
+import hashlib
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from .config import settings
+
+
+def _quantize(vectors: np.ndarray):
+    """Symmetric per-row int8 quantization: returns (int8 values, float32 scales)."""
+    peak = np.abs(vectors).max(axis=-1, keepdims=True)
+    scale = np.where(peak > 0, 127.0 / np.maximum(peak, 1e-12), 1.0).astype(np.float32)
+    return np.rint(vectors * scale).astype(np.int8), scale
+
+
+class _Bucket:
+    """All cached answers that were produced from one exact set of retrieved chunks."""
+
+    def __init__(self, dim: int):
+        # int8 rows + one scale each: a quarter of the float32 footprint.
+        self.matrix = np.empty((0, dim), dtype=np.int8)
+        self.scales = np.empty((0,), dtype=np.float32)
+        self.payloads: List[str] = []
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        embeddings,
+        threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES
+    ):
+        """
+        Embedding-similarity cache for audit answers.
+        A hit needs a near-duplicate question AND the same retrieved evidence,
+        so a cached verdict is never served against a different context.
+        Holds at most max_entries answers; the oldest is evicted first.
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._exact: Dict[tuple, str] = {}
+        self._buckets: Dict[str, _Bucket] = {}
+        # Insertion order across buckets; a bucket's oldest row is always its row 0.
+        self._order: deque = deque()
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    @staticmethod
+    def hash_sources(docs) -> str:
+        """Order-independent SHA-256 over the retrieved chunks."""
+        digests = sorted({
+            hashlib.sha256(
+                f"{d.metadata.get('source_file')}\n{d.page_content}".encode("utf-8")
+            ).hexdigest()
+            for d in docs
+        })
+        return hashlib.sha256("".join(digests).encode("ascii")).hexdigest()
+
+    @staticmethod
+    def unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def embed(self, question: str) -> np.ndarray:
+        return self.unit(await self.embeddings.aembed_query(question))
+
+    def get_exact(self, question: str, source_hash: str) -> Optional[str]:
+        return self._exact.get((self.normalize(question), source_hash))
+
+    def get_similar(self, query_vec: np.ndarray, source_hash: str) -> Optional[str]:
+        bucket = self._buckets.get(source_hash)
+        if bucket is None or not bucket.payloads:
+            return None
+
+        # Rows are unit-length before quantization, so rescaling the int32
+        # dot products recovers (approximate) cosine scores in one matmul.
+        q_query, q_scale = _quantize(query_vec)
+        dots = np.matmul(bucket.matrix, q_query, dtype=np.int32)
+        scores = dots / (bucket.scales * q_scale)
+        best = int(np.argmax(scores))
+        if scores[best] > self.threshold:
+            logger.debug(f"Semantic cache hit (score={scores[best]:.3f})")
+            return bucket.payloads[best]
+        return None
+
+    def add(self, question: str, query_vec: np.ndarray, source_hash: str, payload: str):
+        key = (self.normalize(question), source_hash)
+        self._exact[key] = payload
+        self._order.append(key)
+
+        bucket = self._buckets.get(source_hash)
+        if bucket is None:
+            bucket = self._buckets[source_hash] = _Bucket(query_vec.shape[0])
+        q_vec, scale = _quantize(query_vec)
+        bucket.matrix = np.vstack([bucket.matrix, q_vec[np.newaxis, :]])
+        bucket.scales = np.append(bucket.scales, scale)
+        bucket.payloads.append(payload)
+
+        while len(self._order) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        key = self._order.popleft()
+        source_hash = key[1]
+        bucket = self._buckets[source_hash]
+        payload = bucket.payloads.pop(0)
+        bucket.matrix = bucket.matrix[1:]
+        bucket.scales = bucket.scales[1:]
+        if not bucket.payloads:
+            del self._buckets[source_hash]
+        # A newer answer for the same question may have replaced this one.
+        if self._exact.get(key) is payload:
+            del self._exact[key]
+
+    def clear(self):
+        self._exact.clear()
+        self._buckets.clear()
+        self._order.clear()
+        logger.debug("Semantic cache cleared.")
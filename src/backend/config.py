@@ -10,6 +10,18 @@ class Settings(BaseSettings):
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     RETRIEVAL_K : int = 5
+    RETRIEVAL_FETCH_K: int = 20
+    RERANK_MODEL: str = "BAAI/bge-reranker-base"
+    # Keep a multiple of EMBEDDING_BATCH_SIZE so every slice fills whole embedding requests.
+    CHROMA_BATCH_SIZE: int = 200
+    EMBEDDING_BATCH_SIZE: int = 100
+
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_MAXSIZE: int = 1024
+    AUDIT_CONCURRENCY: int = 8
+    EXTRACTION_WINDOW_CHARS: int = 32000
+    EXTRACTION_WINDOW_OVERLAP_CHARS: int = 2000
 
     class Config: 
         env_file = ".env"
@@ -1,10 +1,11 @@
 import json
+import asyncio
 from pathlib import Path
 from typing import List
 from loguru import logger
 from pydantic import BaseModel, Field
 
-from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.document_loaders import PyPDFium2Loader
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
@@ -14,6 +15,17 @@ from .config import settings
 CURRENT_DIR = Path(__file__).parent.resolve()
 PROMPT_PATH = CURRENT_DIR / "data" / "extraction_prompt.txt"
 
+def _drop_fragments(questions: List[str]) -> List[str]:
+    """
+    Removes questions that only appear as part of a longer extracted question.
+    These are the halves that a window boundary cut off, seen whole in the overlap.
+    """
+    normalized = [" ".join(q.split()) for q in questions]
+    return [
+        q for q, n in zip(questions, normalized)
+        if not any(n != other and n in other for other in normalized)
+    ]
+
 class QuestionList(BaseModel):
     questions: List[str] = Field(description="List of extracted audit questions")
 
@@ -37,39 +49,68 @@ class AuditQuestionExtractor:
             with open(PROMPT_PATH, "r", encoding="utf-8") as f:
                 prompt_text = f.read()
 
-            self.prompt = ChatPromptTemplate.from_template(prompt_text)
+            # Format instructions are identical for every window, so bind them once.
+            self.prompt = ChatPromptTemplate.from_template(prompt_text).partial(
+                format_instructions=self.parser.get_format_instructions()
+            )
             logger.debug("Loaded extraction prompt successfully.")
 
         except Exception as e:
             logger.error(f"Failed to load prompt: {e}")
             raise e
 
-    def extract_from_file(self, file_path: str) -> List[str]:
+    def _load_windows(self, file_path: str) -> List[str]:
+        """
+        Streams pages and packs them into page-aligned windows of at most
+        EXTRACTION_WINDOW_CHARS, so no single request outgrows the context.
+        Each window starts with the last EXTRACTION_WINDOW_OVERLAP_CHARS of the
+        previous one, so a question crossing the boundary is seen whole once.
+        """
+        windows, current, size = [], [], 0
+        for page in PyPDFium2Loader(file_path).lazy_load():
+            text = page.page_content
+            if current and size + len(text) > settings.EXTRACTION_WINDOW_CHARS:
+                windows.append("\n".join(current))
+                tail = current[-1][-settings.EXTRACTION_WINDOW_OVERLAP_CHARS:]
+                current, size = [tail], len(tail)
+            current.append(text)
+            size += len(text)
+
+        if current:
+            windows.append("\n".join(current))
+        return windows
+
+    async def _extract_window(self, chain, window: str, sem: asyncio.Semaphore) -> List[str]:
+        async with sem:
+            try:
+                result = await chain.ainvoke({"context": window})
+                return result.get("questions", [])
+            except Exception as e:
+                logger.error(f"Extraction failed for one window: {e}")
+                return []
+
+    async def extract_from_file(self, file_path: str) -> List[str]:
         """
-        Loads a PDF, sends it to Gemini, and returns a list of questions.
+        Loads a PDF, sends it to Gemini window by window, and returns the
+        de-duplicated list of questions in document order.
         """
         logger.info(f"Extracting questions from: {file_path}")
         try:
-           
-            loader = PyPDFLoader(file_path)
-            pages = loader.load()
-            
-            
-            full_text = "\n".join([p.page_content for p in pages])
-
-            
-            chain = self.prompt | self.llm | self.parser
+            windows = await asyncio.to_thread(self._load_windows, file_path)
+            if not windows:
+                return []
 
-            
-            result = chain.invoke({
-                "context": full_text,
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            chain = self.prompt | self.llm | self.parser
+            sem = asyncio.Semaphore(settings.AUDIT_CONCURRENCY)
+            results = await asyncio.gather(
+                *(self._extract_window(chain, w, sem) for w in windows)
+            )
 
-            questions = result.get("questions", [])
-            logger.success(f"Extracted {len(questions)} questions from {Path(file_path).name}")
+            questions = list(dict.fromkeys(q.strip() for batch in results for q in batch if q.strip()))
+            questions = _drop_fragments(questions)
+            logger.success(f"Extracted {len(questions)} questions from {Path(file_path).name} ({len(windows)} windows)")
             return questions
 
         except Exception as e:
             logger.error(f"Extraction failed: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -1,29 +1,38 @@
 import os
-import json
+import re
+import asyncio
+import hashlib
 import zipfile
 import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Tuple
 
+import orjson
 from loguru import logger
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
+from langchain.retrievers.document_compressors import CrossEncoderReranker
+from langchain_core.documents import Document
 
 from .config import settings
+from .pdf_loader import load_pdf_pages
+from .retrievers import OnnxCrossEncoder, RerankedVectorRetriever
 
 # --- PATHS ---
 CURRENT_DIR = Path(__file__).parent.resolve()
 DATA_DIR = CURRENT_DIR / "data"
 REGISTRAR_PROMPT_PATH = DATA_DIR / "intake_registrar_prompt.txt"
 
+# Registrar replies are often wrapped in a ```json ... ``` fence, sometimes left unclosed.
+_FENCE_RE = re.compile(rb"```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+
 class PolicyIngestor:
     def __init__(self):
         """
-        Initializes the Ingestor with Content-Based Naming and Hybrid Search support.
+        Initializes the Ingestor with Content-Based Naming and Reranked Search support.
         """
         logger.debug("Initializing optimized PolicyIngestor...")
         
@@ -52,53 +61,149 @@ class PolicyIngestor:
             logger.error(f"Registrar prompt missing at {REGISTRAR_PROMPT_PATH}")
             self.registrar_template = "Identify this doc. Return JSON: {{'formal_title': '...', 'category': '...'}}. Text: {text}"
 
+        self._ingest_hooks: List[Callable[[], None]] = []
+
+        # Rebuilt only after ingestion; the lock stops a burst of audits from rebuilding in parallel.
+        # Generations let an ingest that lands mid-rebuild invalidate the fresh retriever too.
+        self._retriever = None
+        self._ingest_generation = 0
+        self._retriever_generation = -1
+        self._retriever_lock = asyncio.Lock()
+
+        # Loaded once at startup so the first audit never waits on a model download.
+        self._cross_encoder = OnnxCrossEncoder(settings.RERANK_MODEL)
+        logger.debug(f"Loaded reranker {settings.RERANK_MODEL}")
+
+    def register_ingest_hook(self, hook: Callable[[], None]):
+        """Registers a callback fired after new chunks land in the vectorstore."""
+        self._ingest_hooks.append(hook)
+
+    def _on_ingested(self):
+        self._ingest_generation += 1
+        for hook in self._ingest_hooks:
+            hook()
+
     def _get_actual_metadata(self, first_page_text: str) -> dict:
 
         try:
             prompt = self.registrar_template.format(text=first_page_text[:3000])
             res = self.tagger_llm.invoke(prompt)
-            clean_json = res.content.strip().replace("```json", "").replace("```", "")
-            return json.loads(clean_json)
+            raw = res.content.encode("utf-8")
+            fenced = _FENCE_RE.search(raw)
+            return orjson.loads(fenced.group(1) if fenced else raw.strip())
         except Exception as e:
             logger.warning(f"Metadata extraction failed: {e}")
             return {"formal_title": "Unknown Policy", "category": "General"}
 
+    @staticmethod
+    def _file_hash(file_path: str) -> str:
+        """Content address of a PDF; BLAKE2b is cheaper than SHA-256 for this."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _indexed_chunk_count(self, doc_hash: str) -> int:
+        """
+        Number of chunks stored for this content hash, or 0 unless all of them are.
+        Leftovers from an interrupted write are purged so the file is indexed again.
+        """
+        existing = self.vectorstore._collection.get(where={"doc_hash": doc_hash}, include=["metadatas"])
+        stored = len(existing["ids"])
+        if not stored:
+            return 0
+        if stored == existing["metadatas"][0].get("doc_chunks"):
+            return stored
+
+        logger.warning(f"Re-indexing {doc_hash}: only {stored} chunks were stored")
+        self.vectorstore._collection.delete(ids=existing["ids"])
+        return 0
+
+    def _prepare_chunks(self, pages: List[Tuple[str, int]], original_name: str, doc_hash: str) -> List[Document]:
+        """
+        Tags and splits one parsed PDF. Nothing is embedded here so callers
+        can batch the vectorstore writes across many files.
+        """
+        if not pages: return []
+        page_docs = [Document(page_content=text, metadata={"page": page_num}) for text, page_num in pages]
+
+        
+        doc_info = self._get_actual_metadata(page_docs[0].page_content)
+        actual_title = doc_info.get("formal_title", original_name)
+        category = doc_info.get("category", "General")
+
+        
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=settings.CHUNK_SIZE,
+            chunk_overlap=settings.CHUNK_OVERLAP
+        )
+        chunks = splitter.split_documents(page_docs)
+
+        # Built once per document, not once per chunk.
+        base_meta = {
+            "doc_title": actual_title,
+            "category": category,
+            "source_file": original_name,
+            "doc_hash": doc_hash,
+            "doc_chunks": len(chunks)
+        }
+        prefix = f"[[POLICY: {actual_title}]]\n[[CATEGORY: {category}]]\n"
+
+        # Deterministic ids make re-uploads idempotent through Chroma's upsert.
+        for i, chunk in enumerate(chunks):
+            chunk.id = f"{doc_hash}:{i}"
+            chunk.metadata |= base_meta
+            chunk.page_content = prefix + chunk.page_content
+
+        logger.info(f"Prepared: {actual_title} ({len(chunks)} chunks)")
+        return chunks
+
+    def _add_chunks(self, chunks: List[Document]) -> int:
+        """
+        Embeds and upserts one CHROMA_BATCH_SIZE slice at a time
+        (EMBEDDING_BATCH_SIZE texts per API request), so memory stays bounded.
+        Returns the number of chunks written. A failed slice stops the write but
+        keeps earlier slices; _indexed_chunk_count repairs the rest on re-upload.
+        """
+        written = 0
+        for start in range(0, len(chunks), settings.CHROMA_BATCH_SIZE):
+            batch = chunks[start:start + settings.CHROMA_BATCH_SIZE]
+            texts = [c.page_content for c in batch]
+            try:
+                vectors = self.embeddings.embed_documents(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+                self.vectorstore._collection.upsert(
+                    ids=[c.id for c in batch],
+                    embeddings=vectors,
+                    metadatas=[c.metadata for c in batch],
+                    documents=texts
+                )
+            except Exception as e:
+                logger.error(f"Indexing stopped after {written}/{len(chunks)} chunks: {e}")
+                break
+            written += len(batch)
+        return written
+
     def ingest_pdf(self, file_path: str, original_name: str) -> int:
         """
         Processes a single PDF with Soft Filtering and Metadata Enrichment.
+        Unchanged files (same content hash) are not re-embedded.
         """
         try:
-            loader = PyPDFLoader(file_path)
-            pages = loader.load()
-            if not pages: return 0
+            doc_hash = self._file_hash(file_path)
+            existing = self._indexed_chunk_count(doc_hash)
+            if existing:
+                logger.info(f"Skipping {original_name}: already indexed ({existing} chunks)")
+                return existing
 
-            
-            doc_info = self._get_actual_metadata(pages[0].page_content)
-            actual_title = doc_info.get("formal_title", original_name)
-            category = doc_info.get("category", "General")
+            chunks = self._prepare_chunks(load_pdf_pages(file_path), original_name, doc_hash)
+            if not chunks: return 0
 
-            
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=settings.CHUNK_SIZE,
-                chunk_overlap=settings.CHUNK_OVERLAP
-            )
-            chunks = splitter.split_documents(pages)
-
-            for chunk in chunks:
-                chunk.metadata.update({
-                    "doc_title": actual_title,
-                    "category": category,
-                    "source_file": original_name
-                })
-                chunk.page_content = (
-                    f"[[POLICY: {actual_title}]]\n"
-                    f"[[CATEGORY: {category}]]\n"
-                    f"{chunk.page_content}"
-                )
-
-            self.vectorstore.add_documents(chunks)
-            logger.success(f"Ingested: {actual_title} ({len(chunks)} chunks)")
-            return len(chunks)
+            written = self._add_chunks(chunks)
+            if written:
+                self._on_ingested()
+            logger.success(f"Ingested: {original_name} ({written}/{len(chunks)} chunks)")
+            return written
 
         except Exception as e:
             logger.error(f"Failed to ingest {original_name}: {e}")
@@ -106,44 +211,90 @@ class PolicyIngestor:
 
     def ingest_zip(self, zip_path: str) -> int:
         """
-        Processes ZIP files sequentially for hosting stability.
+        Parses new PDFs in a process pool, tags and splits them as they finish,
+        then writes all chunks in shared batches.
         """
-        total_chunks = 0
+        all_chunks = []
+        reused_chunks = 0
+        prepared_files = 0
         with zipfile.ZipFile(zip_path, 'r') as z:
             pdf_files = [f for f in z.namelist() if f.lower().endswith(".pdf") and not f.startswith('__MACOSX')]
+            if not pdf_files:
+                return 0
             
             with tempfile.TemporaryDirectory() as tmp_dir:
                 z.extractall(tmp_dir)
+
+                # Duplicate copies inside one archive count once, whether new or reused.
+                new_files, seen = {}, set()
                 for f_name in pdf_files:
-                    full_path = os.path.join(tmp_dir, f_name)
-                    count = self.ingest_pdf(full_path, f_name)
-                    total_chunks += count
-                    
-        return total_chunks
+                    doc_hash = self._file_hash(os.path.join(tmp_dir, f_name))
+                    if doc_hash in seen:
+                        logger.info(f"Skipping {f_name}: duplicate within archive")
+                        continue
+                    seen.add(doc_hash)
 
-    def get_retriever(self):
+                    existing = self._indexed_chunk_count(doc_hash)
+                    if existing:
+                        logger.info(f"Skipping {f_name}: already indexed ({existing} chunks)")
+                        reused_chunks += existing
+                    else:
+                        new_files[f_name] = doc_hash
+
+                # Text extraction is CPU-bound; the registrar LLM call stays in this process.
+                # "spawn" avoids forking a process that holds gRPC and Chroma threads.
+                if new_files:
+                    workers = min(len(new_files), os.cpu_count() or 1)
+                    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                        futures = {f: executor.submit(load_pdf_pages, os.path.join(tmp_dir, f)) for f in new_files}
+                        for f_name, future in futures.items():
+                            try:
+                                chunks = self._prepare_chunks(future.result(), f_name, new_files[f_name])
+                                if chunks:
+                                    all_chunks.extend(chunks)
+                                    prepared_files += 1
+                            except Exception as e:
+                                logger.error(f"Failed to ingest {f_name}: {e}")
+
+        if not all_chunks:
+            return reused_chunks
+
+        written = self._add_chunks(all_chunks)
+        if written:
+            self._on_ingested()
+
+        logger.success(f"Ingested {prepared_files} new files ({written}/{len(all_chunks)} chunks, {reused_chunks} reused)")
+        return written + reused_chunks
+
+    def _build_retriever(self):
         """
-        Requirement: Accuracy via Hybrid Search (Vector + BM25).
+        Requirement: Accuracy via wide vector recall + cross-encoder precision.
+        Fetches RETRIEVAL_FETCH_K candidates and reranks them down to RETRIEVAL_K.
+        Returns None while nothing is indexed.
         """
+        if self.vectorstore._collection.count() == 0:
+            return None
         
         vector_retriever = self.vectorstore.as_retriever(
-            search_kwargs={"k": settings.RETRIEVAL_K}
+            search_kwargs={"k": settings.RETRIEVAL_FETCH_K}
         )
 
-        all_docs = self.vectorstore.get()
-        if not all_docs['documents']:
-            return vector_retriever
-            
-        from langchain_core.documents import Document
-        docs = [Document(page_content=txt, metadata=md) 
-                for txt, md in zip(all_docs['documents'], all_docs['metadatas'])]
-        
-        bm25_retriever = BM25Retriever.from_documents(docs)
-        bm25_retriever.k = settings.RETRIEVAL_K
+        # The model survives rebuilds; only the lightweight wrappers are recreated.
+        reranker = CrossEncoderReranker(model=self._cross_encoder, top_n=settings.RETRIEVAL_K)
 
-        ensemble_retriever = EnsembleRetriever(
-            retrievers=[bm25_retriever, vector_retriever],
-            weights=[0.3, 0.7] 
+        return RerankedVectorRetriever(
+            base_compressor=reranker,
+            base_retriever=vector_retriever
         )
-        
-        return ensemble_retriever
\ No newline at end of file
+
+    async def get_retriever(self):
+        """Returns the cached retriever, rebuilding it once after any ingestion."""
+        if self._retriever_generation == self._ingest_generation:
+            return self._retriever
+
+        async with self._retriever_lock:
+            generation = self._ingest_generation
+            if self._retriever_generation != generation:
+                self._retriever = await asyncio.to_thread(self._build_retriever)
+                self._retriever_generation = generation
+        return self._retriever
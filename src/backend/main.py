@@ -1,16 +1,18 @@
 import os
-import shutil
 import tempfile
-import json
 import asyncio
 from typing import List, Union
 
+import aiofiles
+import orjson
+
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from loguru import logger
 
+from .config import settings
 from .ingestion import PolicyIngestor
 from .auditor import AuditEngine
 from .extractor import AuditQuestionExtractor
@@ -26,7 +28,8 @@ app.add_middleware(
 
 logger.info("Initializing TrueCite Engines...")
 global_ingestor = PolicyIngestor()
-auditor_engine = AuditEngine()
+auditor_engine = AuditEngine(embeddings=global_ingestor.embeddings)
+global_ingestor.register_ingest_hook(auditor_engine.clear_cache)
 extractor_engine = AuditQuestionExtractor()
 logger.success("Engines Ready.")
 
@@ -40,11 +43,17 @@ class AuditResponse(BaseModel):
     status: str
     sources: List[str]
 
-def save_upload_file(upload_file: UploadFile) -> str:
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+async def save_upload_file(upload_file: UploadFile) -> str:
+    """Copies the upload to disk in 1 MiB chunks without blocking the event loop."""
     suffix = os.path.splitext(upload_file.filename)[1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(upload_file.file, tmp)
-        return tmp.name
+    fd, tmp_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    async with aiofiles.open(tmp_path, "wb") as tmp:
+        while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+            await tmp.write(chunk)
+    return tmp_path
 
 @app.get("/")
 def health_check():
@@ -52,7 +61,7 @@ def health_check():
 
 @app.post("/ingest/policies")
 async def ingest_policies(file: UploadFile = File(...)):
-    temp_path = save_upload_file(file)
+    temp_path = await save_upload_file(file)
     try:
         count = global_ingestor.ingest_zip(temp_path)
         return {"message": "Ingestion successful", "chunks_indexed": count}
@@ -63,7 +72,7 @@ async def ingest_policies(file: UploadFile = File(...)):
 @app.post("/audit/ask", response_model=AuditResponse)
 async def ask_single_question(request: SingleAuditRequest):
     """Manual Chat Endpoint"""
-    retriever = global_ingestor.get_retriever()
+    retriever = await global_ingestor.get_retriever()
     if not retriever:
         raise HTTPException(status_code=400, detail="No policies indexed.")
     
@@ -81,47 +90,61 @@ async def run_bulk_audit_stream(file: UploadFile = File(...)):
     """
     Takes one Audit PDF, extracts questions, and streams results.
     """
-    retriever = global_ingestor.get_retriever()
+    retriever = await global_ingestor.get_retriever()
     if not retriever:
         raise HTTPException(status_code=400, detail="No policies indexed. Please upload policies first.")
 
-    path = save_upload_file(file)
+    path = await save_upload_file(file)
     
     try:
         logger.info(f"Extracting questions from {file.filename}...")
-        questions = extractor_engine.extract_from_file(path)
+        questions = await extractor_engine.extract_from_file(path)
         
         if not questions:
             raise HTTPException(status_code=400, detail="Could not extract any questions.")
 
         async def audit_generator():
-            yield json.dumps({"type": "meta", "total": len(questions)}) + "\n"
-
-            for q_text in questions:
-         
-                yield " " 
-                try:
-                    res = await auditor_engine.run_audit(q_text, retriever)
-                    
-                    data = {
-                        "type": "result",
-                        "question": res.question,
-                        "thinking": res.thinking,
-                        "answer": res.answer,
-                        "status": res.status,
-                        "sources": res.sources
-                    }
-                    yield json.dumps(data) + "\n"
-                except Exception as e:
-                    logger.error(f"Error auditing question: {e}")
-                    yield json.dumps({
-                        "type": "result",
-                        "question": q_text,
-                        "thinking": "Error during processing.",
-                        "answer": f"Internal Server Error: {str(e)}",
-                        "status": "Error",
-                        "sources": []
-                    }) + "\n"
+            yield orjson.dumps({"type": "meta", "total": len(questions)}) + b"\n"
+
+            sem = asyncio.Semaphore(settings.AUDIT_CONCURRENCY)
+
+            async def audit_one(index: int, q_text: str) -> dict:
+                async with sem:
+                    try:
+                        res = await auditor_engine.run_audit(q_text, retriever)
+                        return {
+                            "type": "result",
+                            "index": index,
+                            "question": res.question,
+                            "thinking": res.thinking,
+                            "answer": res.answer,
+                            "status": res.status,
+                            "sources": res.sources
+                        }
+                    except Exception as e:
+                        logger.error(f"Error auditing question: {e}")
+                        return {
+                            "type": "result",
+                            "index": index,
+                            "question": q_text,
+                            "thinking": "Error during processing.",
+                            "answer": f"Internal Server Error: {str(e)}",
+                            "status": "Error",
+                            "sources": []
+                        }
+
+            # Results stream in completion order; "index" lets the client restore question order.
+            tasks = [asyncio.create_task(audit_one(i, q)) for i, q in enumerate(questions)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    # NDJSON-safe heartbeat: clients skip lines starting with ":".
+                    yield b":keepalive\n"
+                    data = await next_done
+                    yield orjson.dumps(data) + b"\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
         return StreamingResponse(audit_generator(), media_type="application/x-ndjson")
 
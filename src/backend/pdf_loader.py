@@ -0,0 +1,15 @@
+from typing import List, Tuple
+
+from langchain_community.document_loaders import PyPDFium2Loader
+
+
+def load_pdf_pages(path: str) -> List[Tuple[str, int]]:
+    """
+    Extracts (text, page_number) pairs from one PDF.
+    Lives in its own lightweight module so ProcessPoolExecutor workers
+    can import it without pulling in the LLM and vectorstore clients.
+    """
+    return [
+        (page.page_content, page.metadata.get("page", i))
+        for i, page in enumerate(PyPDFium2Loader(path).lazy_load())
+    ]
@@ -0,0 +1,35 @@
+from typing import List, Tuple
+
+from fastembed.rerank.cross_encoder import TextCrossEncoder
+from langchain.retrievers import ContextualCompressionRetriever
+from langchain_community.cross_encoders import BaseCrossEncoder
+from langchain_core.documents import Document
+
+
+class OnnxCrossEncoder(BaseCrossEncoder):
+    """
+    Cross-encoder scored through fastembed's ONNX Runtime models:
+    CPU-only and without a torch install in the image.
+    """
+
+    def __init__(self, model_name: str):
+        self.model = TextCrossEncoder(model_name=model_name)
+
+    def score(self, text_pairs: List[Tuple[str, str]]) -> List[float]:
+        return [float(s) for s in self.model.rerank_pairs(text_pairs)]
+
+
+class RerankedVectorRetriever(ContextualCompressionRetriever):
+    """
+    Vector recall + cross-encoder rerank that can also start from a
+    precomputed query embedding, so callers that already embedded the
+    question (the semantic cache) do not pay for a second embedding call.
+    """
+
+    async def aretrieve_by_vector(self, query: str, embedding: List[float]) -> List[Document]:
+        docs = await self.base_retriever.vectorstore.asimilarity_search_by_vector(
+            embedding, **self.base_retriever.search_kwargs
+        )
+        if not docs:
+            return []
+        return list(await self.base_compressor.acompress_documents(docs, query))
@@ -65,6 +65,35 @@ with tab1:
                 st.error(f"Connection Error: {e}")
 
 
+def render_results(results_area, results_data):
+    """Renders result cards and the Excel export for whatever results arrived."""
+    # Results arrive in completion order; restore the PDF's question order.
+    results_data.sort(key=lambda r: r.get("index", 0))
+
+    # Render all result cards in one pass once the stream is closed.
+    for data in results_data:
+        icon = {"Compliant": "✅", "Non-Compliant": "❌", "Partial": "⚠️", "Missing Info": "❓"}.get(data['status'], "ℹ️")
+        
+        with results_area.expander(f"{icon} {data['question'][:100]}..."):
+
+            st.markdown(f"**Auditor Logic:**")
+            st.markdown(f"<div class='thinking-box'>{data.get('thinking')}</div>", unsafe_allow_html=True)
+            
+            # 2. Show Answer and Status
+            st.markdown(f"**Verdict:** {data['status']}")
+            st.write(data['answer'])
+            st.divider()
+            st.caption(f"Cited Files: {', '.join(data['sources'])}")
+    
+    # Excel Export (Include Thinking in the report)
+    if results_data:
+        df = pd.DataFrame(results_data)
+        output = BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            df.to_excel(writer, index=False)
+        st.download_button("Download Full Audit Report (Excel)", output.getvalue(), "Compliance_Report.xlsx")
+
+
 with tab2:
     st.header("Bulk Audit from PDF")
     uploaded_file = st.file_uploader("Upload 'Audit Requirements PDF'", type=["pdf"])
@@ -84,8 +113,9 @@ with tab2:
                 if response.status_code == 200:
                     total_q = 0
                     processed = 0
-                    status_box.info("Audit started! Processing questions one by one...")
+                    status_box.info("Audit started! Tracking progress as questions finish...")
                     
+                    # Keep this loop cheap so the backend is never throttled by rendering.
                     for line in response.iter_lines():
                         if line:
                             decoded_line = line.decode('utf-8').strip()
@@ -104,32 +134,17 @@ with tab2:
                                 # Update Progress
                                 if total_q > 0:
                                     progress_bar.progress(processed / total_q)
-                                
-                                # Show Result Card
-                                icon = {"Compliant": "✅", "Non-Compliant": "❌", "Partial": "⚠️", "Missing Info": "❓"}.get(data['status'], "ℹ️")
-                                
-                                with results_area.expander(f"{icon} {data['question'][:100]}..."):
-                
-                                    st.markdown(f"**Auditor Logic:**")
-                                    st.markdown(f"<div class='thinking-box'>{data.get('thinking')}</div>", unsafe_allow_html=True)
-                                    
-                                    # 2. Show Answer and Status
-                                    st.markdown(f"**Verdict:** {data['status']}")
-                                    st.write(data['answer'])
-                                    st.divider()
-                                    st.caption(f"Cited Files: {', '.join(data['sources'])}")
+                                    status_box.text(f"{processed}/{total_q} requirements audited...")
 
                     status_box.success(f"Audit Complete! Processed {processed} requirements.")
-                    
-                    # Excel Export (Include Thinking in the report)
-                    if results_data:
-                        df = pd.DataFrame(results_data)
-                        output = BytesIO()
-                        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                            df.to_excel(writer, index=False)
-                        st.download_button("Download Full Audit Report (Excel)", output.getvalue(), "Compliance_Report.xlsx")
                 else:
                     st.error(f"Server Error: {response.text}")
 
         except Exception as e:
-            st.error(f"Connection Error: {e}")
\ No newline at end of file
+            st.error(f"Connection Error: {e}")
+            if results_data:
+                st.warning(f"Stream interrupted; showing the {len(results_data)} results received so far.")
+
+        finally:
+            # Partial results from a broken stream are still shown and exportable.
+            render_results(results_area, results_data)
\ No newline at end of file